@@ -2,13 +2,11 @@
 from fastapi import FastAPI, Query
 from pydantic import BaseModel
 from typing import List, Optional, Dict
-import pandas as pd
-import numpy as np
-from fastapi.responses import JSONResponse, HTMLResponse
-import os
-import math
-import re
+import orjson
+from fastapi.responses import JSONResponse, HTMLResponse, Response
 from datetime import datetime
+from functools import lru_cache
+from usage_core import load_dataframe, filter_mask, count_reports, group_reports
 
 app = FastAPI(
     title="Usage and Cost Report API",
@@ -125,22 +123,11 @@ async def redoc_html():
     """
     return HTMLResponse(content=html_content)
 
-CSV_FILE = "cost_report.csv"
 MAX_ROWS_LIMIT = 10  # Default maximum rows limit
 ABSOLUTE_MAX_ROWS_LIMIT = 100  # Absolute maximum rows limit (cannot be exceeded)
 
-def load_dataframe():
-    try:
-        if not os.path.exists(CSV_FILE):
-            raise FileNotFoundError(f"CSV file '{CSV_FILE}' not found.")
-        df = pd.read_csv(CSV_FILE)
-        print("CSV columns:", df.columns.tolist())  # Debug print
-        df.replace({np.inf: None, -np.inf: None}, inplace=True)
-        df = df.where(pd.notnull(df), None)
-        return df
-    except Exception as e:
-        raise RuntimeError(f"Failed to load CSV: {e}")
-
+# Loaded once at startup and treated as read-only: requests only index into it
+# with boolean masks, never mutate it in place.
 df = None
 try:
     df = load_dataframe()
@@ -176,30 +163,49 @@ def validate_numeric(value, param_name):
     """Validate that a parameter contains only numeric characters"""
     if value is None:
         return True
-    if not re.match(r'^\d+$', str(value).strip()):
-        return False
-    return True
+    # str.isdecimal() accepts exactly the Unicode digits a \d+ regex would
+    return str(value).strip().isdecimal()
 
 def validate_date(date_str, param_name):
     """Validate date format YYYY-MM-DD"""
     if date_str is None:
         return True
+    # Cheap shape check first: strptime only accepts 8-10 chars with '-' after the year
+    if not (8 <= len(date_str) <= 10 and date_str[4] == '-'):
+        return False
     try:
         datetime.strptime(date_str, '%Y-%m-%d')
         return True
     except ValueError:
         return False
 
-def clean_nans(obj):
-    if isinstance(obj, float):
-        if math.isnan(obj) or math.isinf(obj):
-            return None
-        return obj
-    elif isinstance(obj, list):
-        return [clean_nans(x) for x in obj]
-    elif isinstance(obj, dict):
-        return {k: clean_nans(v) for k, v in obj.items()}
-    return obj
+@lru_cache(maxsize=512)
+def compute_usage_report(subscription_id, database_id, plan_type, start_date, end_date, region, tag1, tag2, limit):
+    """Filter, group and serialize the usage report for already-validated parameters.
+
+    Returns `(status_code, json_bytes)` holding the complete response body. Results
+    are memoized per parameter combination since df is read-only; call
+    `compute_usage_report.cache_clear()` if df is ever reloaded.
+    """
+    mask = filter_mask(
+        df, subscription_id=subscription_id, database_id=database_id, plan_type=plan_type,
+        start_date=start_date, end_date=end_date, region=region, tag1=tag1, tag2=tag2
+    )
+    if not mask.any():
+        return 200, orjson.dumps({"data": [], "total_rows": 0})
+
+    # Check if result count exceeds specified limit before materializing any rows
+    total_available = count_reports(df, mask)
+
+    # If total available exceeds specified limit, return error
+    if total_available > limit:
+        return 413, orjson.dumps({
+            "error": "RowLimitExceeded",
+            "message": f"The number of rows matching your request ({total_available}) exceeds the specified limit of {limit}. Please adjust your filters or increase the limit (max: {ABSOLUTE_MAX_ROWS_LIMIT})."
+        })
+
+    data = list(group_reports(df, mask))
+    return 200, orjson.dumps({"data": data, "total_rows": len(data)}, option=orjson.OPT_SERIALIZE_NUMPY)
 
 @app.get("/usage-cost-report", response_model=UsageReportResponse)
 def get_usage_report(
@@ -265,113 +271,12 @@ def get_usage_report(
 
         if df is None:
             return JSONResponse(status_code=500, content={"error": "CSV file could not be loaded."})
-        filtered = df.copy()
-
-        if subscription_id:
-            filtered = filtered[filtered["Cluster id"].astype(str) == subscription_id]
-        if database_id:
-            # Filter by database ID, handling N/A values and float conversion
-            # Convert database_id to float for comparison since CSV stores as float
-            try:
-                database_id_float = float(database_id)
-                filtered = filtered[filtered["Database id"] == database_id_float]
-            except ValueError:
-                # If conversion fails, treat as string comparison
-                filtered = filtered[filtered["Database id"].astype(str) == database_id]
-        if plan_type:
-            filtered = filtered[filtered["Plan Type"].str.lower() == plan_type.lower()]
-        if start_date:
-            filtered = filtered[filtered["Start date"] >= start_date]
-        if end_date:
-            filtered = filtered[filtered["End date"] <= end_date]
-        if region:
-            filtered = filtered[filtered["Region"] == region]
-        if tag1:
-            # Filter by tag1 value in key1:value column
-            if "key1:value" in filtered.columns:
-                filtered = filtered[filtered["key1:value"].astype(str).str.contains(tag1, na=False)]
-        if tag2:
-            # Filter by tag2 value in key2:value column
-            if "key2:value" in filtered.columns:
-                filtered = filtered[filtered["key2:value"].astype(str).str.contains(tag2, na=False)]
-
-        if filtered.empty:
-            return UsageReportResponse(data=[], total_rows=0)
-
-        # Check if result count exceeds specified limit
-        try:
-            # Group by unique combinations to get distinct reports count
-            unique_groups = filtered.groupby(
-                ["Cluster id", "Cluster name", "Plan Type", "Region", "Start date", "End date"]
-            ).first().reset_index()
-
-            total_available = len(unique_groups)
-
-            # If total available exceeds specified limit, return error
-            if total_available > limit:
-                return JSONResponse(
-                    status_code=413,
-                    content={
-                        "error": "RowLimitExceeded",
-                        "message": f"The number of rows matching your request ({total_available}) exceeds the specified limit of {limit}. Please adjust your filters or increase the limit (max: {ABSOLUTE_MAX_ROWS_LIMIT})."
-                    }
-                )
-
-            # Sort by start date (newest to oldest) if within limit
-            filtered_with_datetime = filtered.copy()
-            filtered_with_datetime['_temp_start_date'] = pd.to_datetime(filtered_with_datetime['Start date'], errors='coerce')
-            filtered_with_datetime = filtered_with_datetime.sort_values('_temp_start_date', ascending=False)
-
-            # Sort the original data by the datetime order
-            sort_order = filtered_with_datetime.index
-            filtered = filtered.reindex(sort_order)
-
-        except Exception as e:
-            # If date parsing fails, continue without sorting
-            pass
-
-        # Detect tag columns (key:value)
-        tag_columns = [col for col in filtered.columns if ":" in col]
-
-        grouped = filtered.groupby(
-            ["Cluster id", "Cluster name", "Plan Type", "Region", "Start date", "End date"]
-        )
-
-        results = []
-        for key, group_df in grouped:
-            charges = []
-            for _, row in group_df.iterrows():
-                # Collect tags if present
-                tags = {k: str(row[k]) for k in tag_columns if pd.notnull(row[k])}
-                charge_item_kwargs = dict(
-                    charge_type=row.get("Charge Type"),
-                    billing_unit_type=row.get("Billing Unit Type"),
-                    quantity=row.get("Billing Unit quantity"),
-                    price_per_hour=row.get("Billing Unit price/hr"),
-                    hours=row.get("Hours"),
-                    subtotal=row.get("Subtotal"),
-                    discount=row.get("Discount"),
-                    total_cost=row.get("Total Cost $")
-                )
-                if tags:
-                    charge_item_kwargs["tags"] = tags
-                charges.append(ChargeItem(**charge_item_kwargs))
-            results.append(UsageReport(
-                subscription_id=str(key[0]),
-                cluster_name=key[1],
-                plan_type=key[2],
-                region=key[3],
-                start_date=str(key[4]),
-                end_date=str(key[5]),
-                charges=charges
-            ))
-
-        # Clean NaN/inf values and return structured response
-        cleaned_results = clean_nans([r.dict(exclude_none=True) for r in results])
-        return UsageReportResponse(
-            data=cleaned_results,
-            total_rows=len(cleaned_results)
+        # Plan type matches case-insensitively, so all spellings share one cache entry
+        status_code, payload = compute_usage_report(
+            subscription_id, database_id, plan_type.lower() if plan_type else plan_type,
+            start_date, end_date, region, tag1, tag2, limit
         )
+        return Response(content=payload, status_code=status_code, media_type="application/json")
 
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
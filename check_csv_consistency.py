@@ -1,31 +1,112 @@
 import csv
-import pandas as pd
+import io
+import mmap
+import os
+import numpy as np
 
 CSV_FILE = 'cost_report.csv'
+CHUNK_SIZE = 16 << 20  # Bytes scanned per window; a window grows if one record is larger
+
+QUOTE, COMMA, CR, LF = (ord(c) for c in '",\r\n')
+
+def count_fields(buf, final=True):
+    """Return (starts, ends, field_counts) for the complete CSV records in a uint8 buffer.
+
+    Delimiters are located with vectorized byte scans instead of running the csv
+    parser row by row. Commas and newlines inside quoted fields are skipped by
+    tracking quote parity (an escaped "" toggles it twice, so it cancels out).
+    The buffer must start at a record boundary; unless `final`, the trailing
+    partial record is left out. Returns None when quoting is irregular (a quote
+    inside an unquoted field, text after a closing quote, a bare '\\r' or an
+    unterminated quote), since csv.reader treats those quotes as literal text and
+    parity no longer matches it; callers should fall back to csv.reader.
+    """
+    quotes = buf == QUOTE
+    in_quotes = np.bitwise_xor.accumulate(quotes)
+    n = len(buf)
+
+    # A quote that opens a field must start it; one that closes a field must end
+    # it (or be the first half of an escaped "")
+    quote_pos = np.flatnonzero(quotes)
+    opening = quote_pos[in_quotes[quote_pos]]
+    closing = quote_pos[~in_quotes[quote_pos]]
+    prev = buf[np.maximum(opening - 1, 0)]
+    if np.any((opening > 0) & (prev != COMMA) & (prev != LF) & (prev != QUOTE)):
+        return None
+    closing = closing[closing < n - 1]
+    nxt = buf[closing + 1]
+    if np.any((nxt != COMMA) & (nxt != LF) & (nxt != CR) & (nxt != QUOTE)):
+        return None
+    # csv.reader also ends a record on a bare '\r'; leave those files to it
+    bare_cr = np.flatnonzero((buf[:-1] == CR) & (buf[1:] != LF) & ~in_quotes[:-1])
+    if len(bare_cr) or (final and in_quotes[-1]):
+        return None
+
+    commas = np.flatnonzero((buf == COMMA) & ~in_quotes)
+    ends = np.flatnonzero((buf == LF) & ~in_quotes)
+    if final and (len(ends) == 0 or ends[-1] != n - 1):
+        ends = np.append(ends, n)  # last record without a trailing newline
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    field_counts = np.searchsorted(commas, ends) - np.searchsorted(commas, starts) + 1
+    # Blank lines (optionally just '\r') parse as empty rows, like csv.reader
+    lengths = ends - starts
+    blank = (lengths == 0) | ((lengths == 1) & (buf[np.minimum(starts, n - 1)] == CR))
+    field_counts[blank] = 0
+    return starts, ends, field_counts
 
 def check_csv_consistency(csv_file):
-    with open(csv_file, newline='', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        try:
-            header = next(reader)
-        except StopIteration:
+    inconsistent_rows = []
+    expected_fields = None
+    record = 0  # records parsed so far; record 1 is the header
+    offset = 0
+    with open(csv_file, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
             print('CSV file is empty.')
             return
-        expected_fields = len(header)
-        inconsistent_rows = []
-        for i, row in enumerate(reader, start=2):  # start=2 because header is line 1
-            if len(row) != expected_fields:
-                inconsistent_rows.append((i, row))
-        if inconsistent_rows:
-            print(f'Found {len(inconsistent_rows)} inconsistent row(s):')
-            for line_num, row in inconsistent_rows:
-                print(f'  Line {line_num}: {row} (fields: {len(row)})')
-        else:
-            print('All rows are consistent with the header.')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data = np.frombuffer(mm, dtype=np.uint8)
+            window = CHUNK_SIZE
+            while offset < size:
+                end = min(offset + window, size)
+                buf = data[offset:end]
+                result = count_fields(buf, final=end == size)
+                if result is None:
+                    break
+                starts, ends, field_counts = result
+                if len(ends) == 0:
+                    window *= 2  # no complete record in this window yet
+                    continue
+                if expected_fields is None:
+                    expected_fields = field_counts[0]
+                for i in np.flatnonzero(field_counts != expected_fields):
+                    # Only the offending records are decoded and parsed for display
+                    text = buf[starts[i]:ends[i]].tobytes().decode('utf-8')
+                    row = next(csv.reader(io.StringIO(text, newline='')), [])
+                    inconsistent_rows.append((record + i + 1, row))
+                record += len(ends)
+                offset += int(ends[-1]) + 1
+                window = CHUNK_SIZE
+            del data, buf  # release the buffer exports before the mmap closes
+        if offset < size:
+            # Irregular quoting: parse the rest of the file exactly as csv.reader does
+            f.seek(offset)
+            reader = csv.reader(io.TextIOWrapper(f, encoding='utf-8', newline=''))
+            for row in reader:
+                record += 1
+                if expected_fields is None:
+                    expected_fields = len(row)
+                elif len(row) != expected_fields:
+                    inconsistent_rows.append((record, row))
+    if inconsistent_rows:
+        print(f'Found {len(inconsistent_rows)} inconsistent row(s):')
+        for line_num, row in inconsistent_rows:
+            print(f'  Line {line_num}: {row} (fields: {len(row)})')
+    else:
+        print('All rows are consistent with the header.')
 
 def main():
     check_csv_consistency(CSV_FILE)
-    df = pd.read_csv("cost_report.csv")
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,64 @@
+import csv
+import io
+
+import numpy as np
+import pytest
+
+import check_csv_consistency as checker
+
+CASES = {
+    'plain': 'a,b,c\n1,2,3\n4,5\n6,7,8,9\n',
+    'crlf': 'a,b,c\r\n1,2,3\r\n4,5\r\n',
+    'blank lines': 'a,b,c\n\n1,2,3\r\n\r\n4,5,6\n',
+    'embedded newlines': 'a,b,c\n"x\ny",2,3\n"p,q\r\nr",5\n',
+    'escaped quotes': 'a,b,c\n"say ""hi""",2,3\n"""",,\n"a""b"",c",1\n',
+    'no trailing newline': 'a,b,c\n1,2,3\n4,5',
+    'stray quote': 'a,b,c\n5" monitor,2,3\n4,5,6\n7,8\n',
+    'text after closing quote': 'a,b,c\n"x"y,2,3\n7,8\n',
+    'unterminated quote': 'a,b,c\n1,2,3\n"4,5\n6\n',
+    'bare cr': 'a,b,c\r1,2\r3,4,5\r',
+}
+IRREGULAR = {'stray quote', 'text after closing quote', 'unterminated quote', 'bare cr'}
+
+def csv_reader_output(text):
+    """Output of the original csv.reader implementation of the checker"""
+    rows = list(csv.reader(io.StringIO(text, newline='')))
+    out = io.StringIO()
+    expected_fields = len(rows[0])
+    inconsistent = [(i, row) for i, row in enumerate(rows[1:], start=2) if len(row) != expected_fields]
+    if inconsistent:
+        print(f'Found {len(inconsistent)} inconsistent row(s):', file=out)
+        for line_num, row in inconsistent:
+            print(f'  Line {line_num}: {row} (fields: {len(row)})', file=out)
+    else:
+        print('All rows are consistent with the header.', file=out)
+    return out.getvalue()
+
+@pytest.mark.parametrize('name', sorted(set(CASES) - IRREGULAR))
+def test_count_fields_matches_csv_reader(name):
+    data = CASES[name].encode()
+    _, _, field_counts = checker.count_fields(np.frombuffer(data, dtype=np.uint8))
+    rows = list(csv.reader(io.StringIO(CASES[name], newline='')))
+    assert field_counts.tolist() == [len(row) for row in rows]
+
+@pytest.mark.parametrize('name', sorted(IRREGULAR))
+def test_count_fields_rejects_irregular_quoting(name):
+    data = CASES[name].encode()
+    assert checker.count_fields(np.frombuffer(data, dtype=np.uint8)) is None
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1 << 20])
+@pytest.mark.parametrize('name', sorted(CASES))
+def test_check_csv_consistency_matches_csv_reader(name, chunk_size, tmp_path, monkeypatch, capsys):
+    path = tmp_path / 'report.csv'
+    path.write_bytes(CASES[name].encode())
+    monkeypatch.setattr(checker, 'CHUNK_SIZE', chunk_size)
+    checker.check_csv_consistency(path)
+    assert capsys.readouterr().out == csv_reader_output(CASES[name])
+
+def test_stray_quote_reports_following_rows(tmp_path, capsys):
+    path = tmp_path / 'report.csv'
+    path.write_bytes(CASES['stray quote'].encode())
+    checker.check_csv_consistency(path)
+    out = capsys.readouterr().out
+    assert "Line 2" not in out
+    assert "Line 4: ['7', '8'] (fields: 2)" in out
@@ -0,0 +1,124 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+import usage_core
+
+HEADER = (
+    "Start date,End date,Cluster id,Cluster name,Plan Type,Charge Type,Database id,Region,"
+    "Billing Unit Type,Billing Unit quantity,Billing Unit price/hr,Hours,Subtotal,Discount,"
+    "Total Cost $,key1:value,key2:value\n"
+)
+
+def report_csv(*rows):
+    """CSV text with HEADER and one usage row per (start, end, cluster_id, key1) tuple"""
+    lines = [
+        f"{start},{end},{cluster_id},Cluster {cluster_id},Pro,Usage,N/A,us-east-1,"
+        f"M7,1,5.59,730,4077,,4077,{key1},\n"
+        for start, end, cluster_id, key1 in rows
+    ]
+    return HEADER + "".join(lines)
+
+@pytest.fixture
+def make_client(tmp_path, monkeypatch):
+    """Return a factory serving the given CSV text through the FastAPI app"""
+    def make(csv_text):
+        csv_file = tmp_path / "cost_report.csv"
+        csv_file.write_text(csv_text, encoding="utf-8")
+        monkeypatch.setattr(usage_core, "CSV_FILE", str(csv_file))
+        monkeypatch.setattr(usage_core, "PARQUET_FILE", str(tmp_path / "cost_report.parquet"))
+        monkeypatch.setattr(app_module, "df", usage_core.load_dataframe())
+        app_module.compute_usage_report.cache_clear()
+        return TestClient(app_module.app)
+    yield make
+    app_module.compute_usage_report.cache_clear()
+
+def get_report(client, **params):
+    return client.get("/usage-cost-report", params={"account_id": "12345", "limit": 100, **params})
+
+def cluster_ids(response):
+    assert response.status_code == 200, response.text
+    return sorted(report["subscription_id"] for report in response.json()["data"])
+
+TAG_ROWS = report_csv(
+    ("10/1/2024", "10/31/2024", 1, "name1:value1"),
+    ("10/1/2024", "10/31/2024", 2, "name15:value15"),
+    ("10/1/2024", "10/31/2024", 3, "env:v1.2"),
+    ("10/1/2024", "10/31/2024", 4, ""),
+)
+
+@pytest.mark.parametrize("needle, expected", [
+    ("name1", ["1", "2"]),  # substring match
+    ("name15:value15", ["2"]),
+    (".", ["3"]),  # metacharacters match literally
+    (".*", []),
+    ("name1|env", []),
+])
+def test_tag_filter_is_literal_substring_match(make_client, needle, expected):
+    client = make_client(TAG_ROWS)
+    assert cluster_ids(get_report(client, tag1=needle)) == expected
+
+DATE_ROWS = report_csv(
+    ("9/1/2024", "9/30/2024", 1, ""),
+    ("11/1/2024", "11/30/2024", 2, ""),
+    ("11/1/24 0:00", "11/15/24 14:59", 3, ""),
+    ("11/16/24 15:00", "11/30/24 23:59", 4, ""),
+)
+
+@pytest.mark.parametrize("params, expected", [
+    # M/D/YYYY and M/D/YY H:MM parse to the same calendar days
+    ({"start_date": "2024-11-01"}, ["2", "3", "4"]),
+    ({"start_date": "2024-11-02"}, ["4"]),
+    ({"start_date": "2024-11-16"}, ["4"]),
+    # end_date includes the whole day, whatever the time of day
+    ({"end_date": "2024-11-15"}, ["1", "3"]),
+    ({"end_date": "2024-11-14"}, ["1"]),
+    ({"end_date": "2024-11-30"}, ["1", "2", "3", "4"]),
+    ({"start_date": "2024-11-01", "end_date": "2024-11-15"}, ["3"]),
+])
+def test_date_filters(make_client, params, expected):
+    client = make_client(DATE_ROWS)
+    assert cluster_ids(get_report(client, **params)) == expected
+
+@pytest.mark.parametrize("params", [
+    {"start_date": "1600-01-01"},
+    {"start_date": "0001-01-01"},
+    {"end_date": "2300-01-01"},
+    {"end_date": "9999-12-31"},
+    {"start_date": "1600-01-01", "end_date": "9999-12-31"},
+])
+def test_date_filters_outside_timestamp_range(make_client, params):
+    client = make_client(DATE_ROWS)
+    assert cluster_ids(get_report(client, **params)) == ["1", "2", "3", "4"]
+
+def test_malformed_numeric_cell_is_served_as_null(make_client):
+    csv_text = report_csv(("10/1/2024", "10/31/2024", 1, ""), ("11/1/2024", "11/30/2024", 2, ""))
+    csv_text = csv_text.replace(",730,", ',"1,000",', 1)
+    client = make_client(csv_text)
+    reports = {report["subscription_id"]: report for report in get_report(client).json()["data"]}
+    assert reports["1"]["charges"][0]["hours"] is None
+    assert reports["2"]["charges"][0]["hours"] == 730
+    assert reports["1"]["charges"][0]["total_cost"] == 4077
+
+def test_missing_charge_columns_are_null(make_client):
+    csv_text = (
+        "Start date,End date,Cluster id,Cluster name,Plan Type,Database id,Region,Hours\n"
+        "10/1/2024,10/31/2024,1,Cluster 1,Pro,N/A,us-east-1,730\n"
+    )
+    client = make_client(csv_text)
+    response = get_report(client)
+    assert response.status_code == 200, response.text
+    charge = response.json()["data"][0]["charges"][0]
+    assert charge["hours"] == 730
+    assert charge["charge_type"] is None
+    assert charge["total_cost"] is None
+
+def test_missing_charge_values_are_none_not_nan(make_client):
+    csv_text = report_csv(("10/1/2024", "10/31/2024", 1, "")).replace(",Usage,", ",,").replace(",M7,", ",,")
+    client = make_client(csv_text)
+    df = app_module.df
+    charge = next(usage_core.group_reports(df, usage_core.filter_mask(df)))["charges"][0]
+    assert charge["charge_type"] is None
+    assert charge["billing_unit_type"] is None
+    assert charge["discount"] is None
+    assert get_report(client).json()["data"][0]["charges"][0]["charge_type"] is None
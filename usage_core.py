@@ -0,0 +1,268 @@
+"""Data loading, filtering and grouping behind the usage and cost report endpoint."""
+import csv
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+CSV_FILE = "cost_report.csv"
+PARQUET_FILE = "cost_report.parquet"  # Typed snapshot of CSV_FILE, rebuilt when the CSV is newer
+CATEGORICAL_COLUMNS = ("Plan Type", "Region", "Cluster name")
+# Columns that identify one usage report; rows sharing them are merged into its charges
+GROUP_COLUMNS = ["Cluster id", "Cluster name", "Plan Type", "Region", "Start date", "End date"]
+# Columns read for each charge item, in the positional order group_reports unpacks
+CHARGE_COLUMNS = (
+    "Charge Type", "Billing Unit Type", "Billing Unit quantity", "Billing Unit price/hr",
+    "Hours", "Subtotal", "Discount", "Total Cost $",
+)
+TEXT_CHARGE_COLUMNS = CHARGE_COLUMNS[:2]
+NUMERIC_CHARGE_COLUMNS = CHARGE_COLUMNS[2:]
+# Arrow types for every column the endpoint reads; tag (key:value) columns are
+# detected from the header and read as strings. All other columns are skipped.
+CSV_COLUMN_TYPES = {
+    "Start date": pa.string(),
+    "End date": pa.string(),
+    "Cluster id": pa.int64(),
+    "Cluster name": pa.string(),
+    "Plan Type": pa.string(),
+    "Database id": pa.float64(),
+    "Region": pa.string(),
+    "Charge Type": pa.string(),
+    "Billing Unit Type": pa.string(),
+    "Billing Unit quantity": pa.float64(),
+    "Billing Unit price/hr": pa.float64(),
+    "Hours": pa.float64(),
+    "Subtotal": pa.float64(),
+    "Discount": pa.float64(),
+    "Total Cost $": pa.float64(),
+}
+
+def csv_schema():
+    """Arrow schema of the columns read from CSV_FILE, in header order"""
+    # utf-8-sig strips a BOM (common in Excel exports) as pyarrow does
+    with open(CSV_FILE, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), [])
+    return pa.schema([
+        (col, CSV_COLUMN_TYPES[col] if col in CSV_COLUMN_TYPES else pa.string())
+        for col in header
+        if col in CSV_COLUMN_TYPES or ":" in col
+    ])
+
+def read_csv_file(schema):
+    def read(column_types):
+        return pacsv.read_csv(
+            CSV_FILE,
+            read_options=pacsv.ReadOptions(block_size=16 << 20, use_threads=True),
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(
+                column_types=column_types,
+                include_columns=schema.names,
+                strings_can_be_null=True,
+            ),
+        )
+
+    try:
+        return read(dict(zip(schema.names, schema.types)))
+    except pa.ArrowInvalid as e:
+        print(f"Falling back to lenient numeric parsing: {e}")
+    # A malformed cell (e.g. "1,000") must not fail the whole load: read every
+    # column as text and turn unparseable numbers into nulls
+    table = read({name: pa.string() for name in schema.names})
+    for i, field in enumerate(schema):
+        if field.type != pa.string():
+            values = pd.to_numeric(table.column(i).to_pandas(), errors="coerce")
+            table = table.set_column(i, field, pa.array(values, type=field.type, from_pandas=True))
+    return table
+
+def read_parquet_snapshot(schema):
+    """Return the Parquet snapshot if it is current and has the expected schema, else None"""
+    if not os.path.exists(PARQUET_FILE) or os.path.getmtime(PARQUET_FILE) < os.path.getmtime(CSV_FILE):
+        return None
+    try:
+        table = pq.read_table(PARQUET_FILE, memory_map=True)
+    except (OSError, pa.ArrowException) as e:
+        print(f"Ignoring unreadable Parquet snapshot: {e}")
+        return None
+    if not table.schema.equals(schema):
+        # Written for a different projection or column types
+        return None
+    return table
+
+def write_parquet_snapshot(table):
+    # Write to a temp file and rename so concurrent workers never see a partial file
+    tmp_file = f"{PARQUET_FILE}.{os.getpid()}.tmp"
+    try:
+        pq.write_table(table, tmp_file, compression="zstd")
+        os.replace(tmp_file, PARQUET_FILE)
+    except (OSError, pa.ArrowException) as e:
+        print(f"Could not write Parquet snapshot: {e}")
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+def load_dataframe():
+    try:
+        if not os.path.exists(CSV_FILE):
+            raise FileNotFoundError(f"CSV file '{CSV_FILE}' not found.")
+        schema = csv_schema()
+        # Reuse the Parquet snapshot across restarts while it is newer than the CSV
+        table = read_parquet_snapshot(schema)
+        if table is None:
+            table = read_csv_file(schema)
+            write_parquet_snapshot(table)
+        # Arrow already tracks nulls, so missing values arrive as None/NaN
+        df = table.to_pandas()
+        print("CSV columns:", df.columns.tolist())  # Debug print
+        # Low-cardinality filter/group columns compare as small integer codes
+        for col in CATEGORICAL_COLUMNS:
+            df[col] = df[col].astype("category")
+        # Tag and text charge columns are read as strings; store them as objects
+        # with None for missing values so charges need no NaN checks (pandas 3
+        # would otherwise hand back NaN for missing strings)
+        for col in [col for col in df.columns if ":" in col or col in TEXT_CHARGE_COLUMNS]:
+            values = df[col].astype(object)
+            df[col] = values.where(values.notna(), None)
+        # Precompute normalized filter columns once instead of per request
+        df["_cluster_id_str"] = df["Cluster id"].astype(str)
+        df["_plan_type_lower"] = df["Plan Type"].str.lower().astype("category")
+        df["_start_dt"] = pd.to_datetime(df["Start date"], format="mixed", errors="coerce")
+        # Whole days for the date filters. pandas stores them at second
+        # resolution, which holds any YYYY-MM-DD bound; comparing the bounds
+        # against datetime64[ns] (pandas 2) silently overflowed outside 1677-2262
+        end_dt = pd.to_datetime(df["End date"], format="mixed", errors="coerce")
+        df["_start_day"] = df["_start_dt"].to_numpy().astype("datetime64[D]")
+        df["_end_day"] = end_dt.to_numpy().astype("datetime64[D]")
+        # Keep rows newest first so filtered results need no per-request sort
+        # (boolean masks preserve this order)
+        df = df.sort_values("_start_dt", ascending=False, kind="mergesort").reset_index(drop=True)
+        # Dense report id per row, numbered by first appearance so ids ascend
+        # newest first as well (-1 for missing keys)
+        df["_group_id"] = df.groupby(GROUP_COLUMNS, observed=True, sort=False).ngroup().fillna(-1).astype(np.int32)
+        return df
+    except Exception as e:
+        raise RuntimeError(f"Failed to load CSV: {e}")
+
+def finite_or_none(arr):
+    """Object copy of a numeric array with NaN/inf replaced by None"""
+    out = arr.astype(object)
+    out[~np.isfinite(arr)] = None
+    return out
+
+def filter_mask(df, *, subscription_id=None, database_id=None, plan_type=None,
+                start_date=None, end_date=None, region=None, tag1=None, tag2=None):
+    """Boolean row mask over df for the given (already validated) filters.
+
+    df is treated as read-only, so callers index it with the mask instead of
+    copying it.
+    """
+    mask = np.ones(len(df), dtype=bool)
+
+    if subscription_id:
+        mask &= df["_cluster_id_str"].values == subscription_id
+    if database_id:
+        # Filter by database ID, handling N/A values and float conversion
+        # Convert database_id to float for comparison since CSV stores as float
+        try:
+            database_id_float = float(database_id)
+            mask &= df["Database id"].values == database_id_float
+        except ValueError:
+            # If conversion fails, treat as string comparison
+            mask &= df["Database id"].astype(str).values == database_id
+    if plan_type:
+        mask &= df["_plan_type_lower"].values == plan_type.lower()
+    # Compare dates as native datetime64 values (unparseable dates are NaT,
+    # which compare False); end_date includes the whole day
+    if start_date:
+        start_day = np.datetime64(datetime.strptime(start_date, '%Y-%m-%d'), "D")
+        mask &= df["_start_day"].to_numpy() >= start_day
+    if end_date:
+        end_day = np.datetime64(datetime.strptime(end_date, '%Y-%m-%d'), "D")
+        mask &= df["_end_day"].to_numpy() <= end_day
+    if region:
+        mask &= (df["Region"] == region).values
+    if tag1:
+        # Filter by tag1 value in key1:value column
+        if "key1:value" in df.columns:
+            # Literal substring match; tag values are str or None since load
+            mask &= df["key1:value"].str.contains(tag1, regex=False, na=False).to_numpy(dtype=bool)
+    if tag2:
+        # Filter by tag2 value in key2:value column
+        if "key2:value" in df.columns:
+            # Literal substring match; tag values are str or None since load
+            mask &= df["key2:value"].str.contains(tag2, regex=False, na=False).to_numpy(dtype=bool)
+    return mask
+
+def count_reports(df, mask):
+    """Number of distinct usage reports among the rows selected by mask"""
+    # Distinct report ids among the matches (-1 marks rows with a missing
+    # key, which groupby used to drop as well)
+    matched_ids = df["_group_id"].to_numpy()[mask]
+    return len(pd.unique(matched_ids[matched_ids >= 0]))
+
+def group_reports(df, mask):
+    """Yield one report dict per group of rows selected by mask, newest first.
+
+    Reports and their charges follow the UsageReport/ChargeItem shape.
+    """
+    # df is already ordered by start date (newest to oldest)
+    filtered = df.loc[mask]
+
+    # Detect tag columns (key:value)
+    tag_columns = [col for col in filtered.columns if ":" in col]
+
+    # Slice rows per group: a stable argsort over the group ids keeps each
+    # group's rows in frame order, searchsorted finds the group boundaries
+    group_ids = filtered["_group_id"].to_numpy()
+    order = np.argsort(group_ids, kind="stable")
+    sorted_ids = group_ids[order]
+    unique_ids = np.unique(sorted_ids[sorted_ids >= 0])
+    starts = np.searchsorted(sorted_ids, unique_ids, side="left")
+    ends = np.searchsorted(sorted_ids, unique_ids, side="right")
+    key_arrays = [filtered[col].to_numpy() for col in GROUP_COLUMNS]
+    # Extract the charge columns once for all matched rows; numeric columns
+    # get NaN/inf -> None in a single vectorized pass and text columns hold
+    # None since load, so the payload never carries NaN. Charge columns
+    # missing from the CSV header are all None
+    charge_arrays = [
+        np.full(len(filtered), None, dtype=object) if col not in filtered.columns
+        else finite_or_none(filtered[col].to_numpy()) if col in NUMERIC_CHARGE_COLUMNS
+        else filtered[col].to_numpy()
+        for col in (*CHARGE_COLUMNS, *tag_columns)
+    ]
+    n_charge = len(CHARGE_COLUMNS)
+
+    for start, end in zip(starts, ends):
+        rows = order[start:end]
+        key = tuple(arr[rows[0]] for arr in key_arrays)
+        # Iterate plain tuples zipped from the group's slice of each column
+        # instead of boxing every row into a Series
+        arrays = [arr[rows] for arr in charge_arrays]
+        charges = []
+        for vals in zip(*arrays):
+            # Collect tags if present (missing values are None since load)
+            tags = {k: value for k, value in zip(tag_columns, vals[n_charge:]) if value is not None}
+            # Plain dicts in the UsageReport/ChargeItem shape; the models
+            # only document the schema, validating every row is wasted work
+            charges.append({
+                "charge_type": vals[0],
+                "billing_unit_type": vals[1],
+                "quantity": vals[2],
+                "price_per_hour": vals[3],
+                "hours": vals[4],
+                "subtotal": vals[5],
+                "discount": vals[6],
+                "total_cost": vals[7],
+                "tags": tags or None,
+            })
+        yield {
+            "subscription_id": str(key[0]),
+            "cluster_name": key[1],
+            "plan_type": key[2],
+            "region": key[3],
+            "start_date": str(key[4]),
+            "end_date": str(key[5]),
+            "charges": charges,
+        }